@@ -1,4 +1,4 @@
-from p_tqdm.p_tqdm import p_map, p_imap, p_umap, p_uimap
+from p_tqdm.p_tqdm import p_map, p_imap, p_umap, p_uimap, s_map, s_imap, t_map, t_imap, t_umap, t_uimap
 from p_tqdm._version import __version__
 
 __all__ = [
@@ -6,5 +6,11 @@ __all__ = [
     'p_imap',
     'p_umap',
     'p_uimap',
+    's_map',
+    's_imap',
+    't_map',
+    't_imap',
+    't_umap',
+    't_uimap',
     '__version__'
 ]
@@ -4,59 +4,689 @@ p_map: Performs a parallel ordered map.
 p_imap: Returns an iterator for a parallel ordered map.
 p_umap: Performs a parallel unordered map.
 p_uimap: Returns an iterator for a parallel unordered map.
-t_map: Performs a sequential map.
-t_imap: Returns an iterator for a sequential map.
+s_map: Performs a sequential map.
+s_imap: Returns an iterator for a sequential map.
+t_map: Performs a multithreaded ordered map.
+t_imap: Returns an iterator for a multithreaded ordered map.
+t_umap: Performs a multithreaded unordered map.
+t_uimap: Returns an iterator for a multithreaded unordered map.
 """
 
+import atexit
+import os
+import sys
+from collections import deque
 from collections.abc import Sized
-from typing import Any, Callable, Generator, Iterable, List
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from functools import partial
+from heapq import heappop, heappush
+from itertools import chain, islice, starmap
+from multiprocessing import get_context
+from threading import Lock
+from time import perf_counter, process_time
+from typing import Any, Callable, Dict, Generator, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 from pathos.helpers import cpu_count
 from pathos.multiprocessing import ProcessPool
 from pathos.threading import ThreadPool
 from tqdm import tqdm
 
-def _parallel(ordered: bool, function: Callable, mode: str, *iterables: Iterable, **kwargs: Any) -> Generator:
-    """Returns a generator for a parallel map with a progress bar.
+try:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:  # Python 3.7
+    SharedMemory = None
+
+try:
+    from loky import get_reusable_executor
+except ImportError:  # loky is optional, maps with backend="loky" use pathos without it
+    get_reusable_executor = None
+
+# The number of seconds starting the worker processes is assumed to take until it has been measured
+_SPAWN_OVERHEAD = 0.5
+
+# The measured number of seconds it took to start the workers of a process pool and run a first task, by mode
+_SPAWN_COSTS: Dict[str, float] = {}
+
+# The number of seconds per item of each function, as timed by the workers during earlier maps
+_ITEM_DURATIONS = WeakKeyDictionary()
+
+# Pools are kept alive between maps so that workers are only started once per (mode, num_cpus, initializer, initargs),
+# where mode is "threading", "parallel" (pathos processes), "fork" (forked standard library processes) or "loky"
+_POOL_CACHE: Dict[Tuple, Any] = {}
+_POOL_CACHE_LOCK = Lock()
+
+# A lock per pool key, held while its pool is started, so that only maps needing that pool wait for its workers
+_POOL_LOCKS: Dict[Tuple, Lock] = {}
+
+# The number of parallel maps that have been started but not cleaned up, guarded by _POOL_CACHE_LOCK
+_ACTIVE_MAPS = 0
+
+def _default_initializer() -> None:
+    """Limits numerical libraries in worker processes to one thread each, so the workers don't oversubscribe the cpus."""
+    os.environ.setdefault('OMP_NUM_THREADS', '1')
+
+    try:
+        from threadpoolctl import threadpool_limits
+    except ImportError:
+        return
+
+    threadpool_limits(1)
+
+def _pool_key(mode: str, num_cpus: int, initializer: Optional[Callable], initargs: Tuple) -> Optional[Tuple]:
+    """Returns the key of a pool in the pool cache, or None if the initargs can't be hashed and the pool isn't cached."""
+    key = (mode, num_cpus, initializer, initargs)
+
+    try:
+        hash(key)
+    except TypeError:
+        return None
+
+    return key
+
+def _get_pool(mode: str, num_cpus: int, initializer: Optional[Callable] = None, initargs: Tuple = ()) -> Any:
+    """Returns the cached pool for the given mode, number of cpus and initializer, creating it if needed.
+
+    Pools with unhashable initargs aren't cached, so a new one is created every time,
+    which the caller must close with _close_pool once its map is done.
+
+    Arguments:
+        mode(str): "threading", "parallel", "fork" or "loky"
+        num_cpus(int): The number of workers in the pool.
+        initializer(Optional[Callable]): A function called in each worker when it starts.
+        initargs(Tuple): The arguments of the initializer.
+
+    Returns:
+        A pathos ThreadPool or ProcessPool, a ProcessPoolExecutor using the fork start method or a loky executor.
+    """
+    key = _pool_key(mode, num_cpus, initializer, initargs)
+    if key is None:
+        return _create_pool(mode, num_cpus, initializer, initargs)
+
+    with _POOL_CACHE_LOCK:
+        pool = _POOL_CACHE.get(key)
+        if pool is not None and mode != "loky":
+            return pool
+        key_lock = _POOL_LOCKS.setdefault(key, Lock())
+
+    with key_lock:
+        with _POOL_CACHE_LOCK:
+            cached = _POOL_CACHE.get(key)
+        if cached is not None and mode != "loky":
+            return cached
+
+        start = perf_counter()
+        pool = _create_pool(mode, num_cpus, initializer, initargs, key)
+
+        if cached is None and mode != "threading":
+            # Time how long the workers take to start and run a task, which later maps compare their own duration with
+            submit = pool.submit if isinstance(pool, Executor) else partial(_pool_submit, pool)
+            submit(int).result()
+            _SPAWN_COSTS[mode] = perf_counter() - start
+
+        with _POOL_CACHE_LOCK:
+            _POOL_CACHE[key] = pool
+
+    return pool
+
+def _create_pool(mode: str, num_cpus: int, initializer: Optional[Callable], initargs: Tuple,
+                 key: Optional[Tuple] = None) -> Any:
+    """Creates a pool for the given mode, number of cpus and initializer (see _get_pool), identified by key if it's cached."""
+    if mode == "loky":
+        # loky keeps a single executor which it replaces when asked for different settings, so always ask for it
+        return get_reusable_executor(max_workers=num_cpus, reuse=True, initializer=initializer, initargs=initargs)
+
+    if mode != "threading" and SharedMemory is not None and os.name == "posix":
+        # Start the shared memory tracker before the workers so that they share it with this process, even
+        # if numpy is only imported later, rather than each worker starting its own which unlinks the
+        # blocks it attached to when the worker exits
+        resource_tracker.ensure_running()
+
+    if mode == "fork":
+        return ProcessPoolExecutor(num_cpus, mp_context=get_context("fork"), initializer=initializer, initargs=initargs)
+    elif mode == "parallel":
+        return ProcessPool(num_cpus, id=key or object(), initializer=initializer, initargs=initargs)
+    else:
+        return ThreadPool(num_cpus, id=key or object(), initializer=initializer, initargs=initargs)
+
+def _shutdown_pools() -> None:
+    """Shuts down the workers of all cached pools. Registered to run when the interpreter exits.
+
+    The workers are closed and joined so that they exit normally, unless a map was left unfinished
+    (e.g. a partially consumed p_imap), in which case they are terminated rather than waiting for its tasks.
+    """
+    with _POOL_CACHE_LOCK:
+        for pool in _POOL_CACHE.values():
+            _close_pool(pool, _ACTIVE_MAPS == 0)
+        _POOL_CACHE.clear()
+
+def _close_pool(pool: Any, graceful: bool = True) -> None:
+    """Shuts down the workers of a pool, waiting for its tasks if graceful and terminating the workers otherwise."""
+    if isinstance(pool, Executor):
+        pool.shutdown(wait=graceful)
+    else:
+        if graceful:
+            pool.close()
+            pool.join()
+        else:
+            pool.terminate()
+        pool.clear()
+
+def _start_map() -> None:
+    """Records that a parallel map has been started, so the pools aren't joined while it may have tasks running."""
+    global _ACTIVE_MAPS
+
+    with _POOL_CACHE_LOCK:
+        _ACTIVE_MAPS += 1
+
+def _finish_map(shared: List[Any], pool: Any = None) -> None:
+    """Frees the resources of a parallel map once it is done, including its pool if it wasn't cached."""
+    global _ACTIVE_MAPS
+
+    _release(shared)
+    if pool is not None:
+        _close_pool(pool)
+    with _POOL_CACHE_LOCK:
+        _ACTIVE_MAPS -= 1
+
+atexit.register(_shutdown_pools)
+
+# numpy arrays larger than this many bytes are sent to worker processes through shared memory
+_SHARED_MIN_NBYTES = 1 << 20
+
+class _SharedItem(NamedTuple):
+    """An element of a numpy array in shared memory, which is sent to the workers instead of the element itself."""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: Any
+    index: int
+    map_id: str  # the name of the map's first shared memory block
+
+# The shared memory blocks a worker is attached to, views of their arrays and the map_id of their map, by name
+_ATTACHED: Dict[str, Tuple[Any, Any, str]] = {}
+
+def _share(iterable: Iterable, iterator: Iterator, start: int, shared: List[Any]) -> Iterator:
+    """Copies a large numpy array to shared memory so that its elements don't need to be pickled.
+
+    Arguments:
+        iterable(Iterable): One of the Iterables containing the data to be mapped.
+        iterator(Iterator): The iterator over the Iterable, which has already yielded start elements.
+        start(int): The index of the first element still to be mapped.
+        shared(List[SharedMemory]): The shared memory blocks of the map, to which the new block is appended.
+
+    Returns:
+        A generator of _SharedItems for the remaining elements of a large numpy array, otherwise the iterator.
+    """
+    np = sys.modules.get('numpy')
+    if SharedMemory is None or np is None or not isinstance(iterable, np.ndarray) or iterable.ndim == 0 \
+            or iterable.dtype.hasobject or iterable[start:].nbytes <= _SHARED_MIN_NBYTES:
+        return iterator
+
+    array = iterable[start:]
+    shm = SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+    shared.append(shm)
+    map_id = shared[0].name
+
+    return (_SharedItem(shm.name, array.shape, array.dtype, index, map_id) for index in range(len(array)))
+
+def _release(shared: List[Any]) -> None:
+    """Frees the shared memory blocks of a map once it is done."""
+    for shm in shared:
+        shm.close()
+        shm.unlink()
+
+def _detach(map_id: str) -> None:
+    """Closes the shared memory blocks a worker is attached to, except those of the given map."""
+    for name in [name for name, (_, _, owner) in _ATTACHED.items() if owner != map_id]:
+        shm, array, _ = _ATTACHED.pop(name)
+        del array
+        try:
+            shm.close()
+        except BufferError:  # an element is still referenced, so the memory is freed once that is gone
+            pass
+
+def _resolve(item: _SharedItem) -> Any:
+    """Returns the array element that a _SharedItem refers to, attaching to its shared memory if needed.
+
+    Only the blocks of one map are kept attached, so a worker lets go of the blocks of earlier maps,
+    which have been unlinked once they finished, as soon as it gets an element of another map.
+    """
+    if item.name not in _ATTACHED:
+        import numpy as np
+
+        _detach(item.map_id)
+
+        if sys.version_info >= (3, 13):
+            shm = SharedMemory(name=item.name, track=False)
+        else:
+            shm = SharedMemory(name=item.name)
+        _ATTACHED[item.name] = (shm, np.ndarray(item.shape, item.dtype, buffer=shm.buf), item.map_id)
+
+    return _ATTACHED[item.name][1][item.index]
+
+def _call_shared(function: Callable, *args: Any) -> Any:
+    """Calls the function after replacing any _SharedItems with the array elements they refer to."""
+    return function(*[_resolve(arg) if type(arg) is _SharedItem else arg for arg in args])
+
+# The mode chosen by mode="auto" for each function that was mapped before
+_AUTO_MODES = WeakKeyDictionary()
+
+def _probe(function: Callable, args: Iterator[Tuple]) -> Tuple[List[Any], float, float]:
+    """Applies the function to the first tuple of arguments in this process and times it.
+
+    Arguments:
+        function(Callable): The function to apply.
+        args(Iterator[Tuple]): The tuples of arguments, one per item.
+
+    Returns:
+        A list with the result of the first item (empty if there are no items),
+        and the wall clock and cpu time in seconds that it took.
+    """
+    start, start_cpu = perf_counter(), process_time()
+    results = [function(*first_args) for first_args in islice(args, 1)]
+
+    return results, perf_counter() - start, process_time() - start_cpu
+
+def _record_duration(function: Callable, size: int, duration: float) -> None:
+    """Records how long a chunk of items of the function took in a worker, for deciding whether later maps of it are worth running in parallel."""
+    try:
+        _ITEM_DURATIONS[function] = duration / size
+    except TypeError:  # functions that can't be weakly referenced aren't recorded
+        pass
+
+def _apply(function: Callable, args: Tuple) -> Any:
+    """Calls the function with a tuple of arguments."""
+    return function(*args)
+
+def _indexed(function: Callable, index: int, args: Tuple) -> Tuple[int, Any]:
+    """Calls the function with a tuple of arguments and tags the result with the index of the item."""
+    return index, function(*args)
+
+def _reorder(indexed_results: Iterable[Tuple[int, Any]], start: int = 0,
+             heap: Optional[List[Tuple[int, Any]]] = None) -> Generator:
+    """Yields results tagged by _indexed in order of their index, holding back results that arrive early.
+
+    Arguments:
+        indexed_results(Iterable[Tuple[int, Any]]): Pairs of index and result, in any order.
+        start(int): The index of the first result.
+        heap(Optional[List[Tuple[int, Any]]]): An empty list in which to hold back results, so the caller can see how many there are.
+
+    Returns:
+        A generator which yields the results in order.
+    """
+    heap = [] if heap is None else heap
+    next_index = start
+
+    for index, result in indexed_results:
+        heappush(heap, (index, result))
+        while heap and heap[0][0] == next_index:
+            yield heappop(heap)[1]
+            next_index += 1
+
+def _run_batch(function: Callable, batch: List[Tuple]) -> Tuple[List[Any], float]:
+    """Applies the function to each tuple of arguments in a batch and times the whole batch.
+
+    Arguments:
+        function(Callable): The function to apply to each tuple of arguments.
+        batch(List[Tuple]): The tuples of arguments, one per item.
+
+    Returns:
+        The list of results and the number of seconds it took to compute them.
+    """
+    start = perf_counter()
+    results = [function(*args) for args in batch]
+
+    return results, perf_counter() - start
+
+class _BatchSizer:
+    """Picks batch sizes so that each batch takes about target_time seconds, as in joblib's auto batching.
+
+    The per item duration is averaged over the last few batches to smooth out noise.
+    """
+
+    min_batch_size = 1
+    max_batch_size = 512
+
+    def __init__(self, target_time: float, history: int = 8) -> None:
+        self.target_time = target_time
+        self.batch_size = self.min_batch_size
+        self._item_durations = deque(maxlen=history)
+
+    def update(self, size: int, duration: float) -> None:
+        """Records how long a batch of the given size took and updates the batch size."""
+        self._item_durations.append(duration / size)
+        item_duration = sum(self._item_durations) / len(self._item_durations)
+        batch_size = int(self.target_time / item_duration) if item_duration > 0 else self.max_batch_size
+        self.batch_size = min(max(batch_size, self.min_batch_size), self.max_batch_size)
+
+def _pool_submit(pool: Any, function: Callable, *args: Any) -> Future:
+    """Submits a task to a pathos pool and returns a Future for its result, as Executor.submit does."""
+    future = Future()
+    pool._serve().apply_async(function, args, callback=future.set_result, error_callback=future.set_exception)
+
+    return future
+
+def _submit_uimap(submit: Callable[..., Future], function: Callable, args: Iterator[Tuple],
+                  num_tasks: Optional[int], chunksize: Any = 1, target_batch_time: float = 0.2,
+                  held: Optional[Callable[[], int]] = None,
+                  on_batch: Optional[Callable[[int, float], None]] = None) -> Generator:
+    """Returns a generator for an unordered map of the function over the arguments, submitting chunks of items as tasks.
+
+    Tasks are submitted from the thread consuming the generator, with at most num_tasks of them submitted
+    but not yet consumed. This applies back-pressure on the workers, so results don't pile up in memory
+    when the consumer is slower than the pool, without blocking the pool's own threads, which are shared
+    by every map on the pool.
+
+    Arguments:
+        submit(Callable[..., Future]): Submits a function and its arguments to the pool, e.g. Executor.submit.
+        function(Callable): The function to apply to each tuple of arguments.
+        args(Iterator[Tuple]): The tuples of arguments, one per item.
+        num_tasks(Optional[int]): The maximum number of tasks submitted but not yet consumed, or None for no limit.
+        chunksize(int or 'auto'): The number of items in each task, or 'auto' to size each chunk so that
+            it takes about target_batch_time seconds, as in joblib's auto batching.
+        target_batch_time(float): With chunksize='auto', the number of seconds each chunk should take.
+        held(Optional[Callable[[], int]]): Returns the number of results the consumer is holding back (e.g. to
+            put them in order). No tasks are submitted while it holds num_tasks chunks' worth of results.
+        on_batch(Optional[Callable[[int, float], None]]): Called with the size of each chunk and the number of
+            seconds the worker took to compute it.
+
+    Returns:
+        A generator which yields the result for each item as soon as its chunk is done.
+    """
+    sizer = _BatchSizer(target_batch_time) if chunksize == 'auto' else None
+    pending = set()
+
+    def fill() -> None:
+        while num_tasks is None or len(pending) < num_tasks:
+            size = sizer.batch_size if sizer else chunksize
+            if held is not None and num_tasks is not None and held() >= num_tasks * size:
+                return
+            batch = list(islice(args, size))
+            if not batch:
+                return
+            pending.add(submit(_run_batch, function, batch))
+
+    fill()
+    while pending:
+        future = next(iter(wait(pending, return_when=FIRST_COMPLETED).done))
+        pending.remove(future)
+
+        results, duration = future.result()
+        if sizer:
+            sizer.update(len(results), duration)
+        if on_batch:
+            on_batch(len(results), duration)
+        for result in results:
+            yield result
+
+        fill()
+
+def _default_cpus() -> int:
+    """Returns the number of cpus this process may run on, which in containers and job schedulers can be fewer than the machine has."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # sched_getaffinity is only available on some platforms, e.g. Linux
+        return cpu_count()
+
+def _get_length(iterables: Tuple[Iterable, ...], total: Optional[int]) -> Optional[int]:
+    """Returns the number of items in a map: total if given, else the length of the shortest Sized Iterable, if any."""
+    if total is not None:
+        return total
+
+    sized = [iterable for iterable in iterables if isinstance(iterable, Sized)]
+
+    return min(map(len, sized)) if sized else None
+
+def _set_tqdm_defaults(kwargs: Dict[str, Any], length: Any) -> None:
+    """Throttles progress bar updates unless the caller configured them.
+
+    By default the bar is redrawn at most every 0.1 seconds and every 0.5% of the items, so fast maps
+    don't spend their time updating the bar. Pass mininterval=0 and miniters=1 to update on every item.
+
+    Arguments:
+        kwargs(Dict[str, Any]): The keyword arguments that will be passed to tqdm, updated in place.
+        length(Optional[int]): The number of items in the map, if known.
+    """
+    kwargs.setdefault('mininterval', 0.1)
+    kwargs.setdefault('miniters', max(1, (length or 1) // 200))
+    kwargs.setdefault('smoothing', 0.3)
+
+def _progress(tqdm_func: Callable, iterable: Iterable, length: Optional[int], kwargs: Dict[str, Any]) -> Iterable:
+    """Wraps an Iterable in a progress bar, unless the bar would be disabled anyway.
+
+    tqdm hides the bar when disable=True, or when disable=None and its output isn't a terminal.
+    Returning the Iterable itself in those cases saves the cost of updating a hidden bar on every item.
+
+    Arguments:
+        tqdm_func(Callable): The tqdm variant to use.
+        iterable(Iterable): The Iterable to wrap.
+        length(Optional[int]): The number of items in the Iterable, if known.
+        kwargs(Dict[str, Any]): The keyword arguments to pass to tqdm.
+
+    Returns:
+        The progress bar iterating over the Iterable, or the Iterable itself.
+    """
+    disable = kwargs.get('disable', False)
+
+    if disable is None:
+        isatty = getattr(kwargs.get('file') or sys.stderr, 'isatty', None)
+        disable = isatty is None or not isatty()
+
+    if disable:
+        return iterable
+
+    return tqdm_func(iterable, total=length, **kwargs)
+
+def _build_iter(ordered: bool, function: Callable, mode: str, *iterables: Iterable,
+                **kwargs: Any) -> Tuple[Iterator, Callable[[], None]]:
+    """Sets up a parallel map with a progress bar.
 
     Arguments:
         ordered(bool): True for an ordered map, false for an unordered map.
         function(Callable): The function to apply to each element of the given Iterables.
-        mode(str): "threaded" or "parallel"
+        mode(str): "threading", "parallel" or "auto"
         iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
 
     Returns:
-        A generator which will apply the function to each element of the given Iterables
-        in parallel in order with a progress bar.
+        The progress bar iterating over the results of the map, and a function
+        which must be called once the map is done to free its resources.
     """
+    if mode not in ("parallel", "threading", "auto"):
+        raise ValueError(f'mode must be "parallel", "threading" or "auto", got {mode!r}')
 
     # Extract num_cpus
     num_cpus = kwargs.pop('num_cpus', None)
 
     # Determine num_cpus
     if num_cpus is None:
-        num_cpus = cpu_count()
+        num_cpus = _default_cpus()
     elif type(num_cpus) == float:
-        num_cpus = int(round(num_cpus * cpu_count()))
+        num_cpus = int(round(num_cpus * _default_cpus()))
+
+    # Extract force_parallel (skips the sequential fallback for small maps)
+    force_parallel = kwargs.pop('force_parallel', False)
+
+    # Extract start_method ("fork" uses forked standard library processes instead of pathos)
+    start_method = kwargs.pop('start_method', None)
+
+    # Extract backend (the library providing the worker processes)
+    backend = kwargs.pop('backend', "pathos")
+
+    if backend not in ("pathos", "loky"):
+        raise ValueError(f'backend must be "pathos" or "loky", got {backend!r}')
+
+    # Extract initializer (run once in each worker when it starts)
+    initializer = kwargs.pop('initializer', _default_initializer)
+    initargs = kwargs.pop('initargs', ())
+
+    # The sequential fallback can't run the initializer, so only use it with the default one
+    if initializer is not None and initializer is not _default_initializer:
+        force_parallel = True
+
+    # Extract workload ("homogeneous" if all items take about as long, which allows a larger default chunksize)
+    workload = kwargs.pop('workload', "heterogeneous")
+
+    if workload not in ("heterogeneous", "homogeneous"):
+        raise ValueError(f'workload must be "heterogeneous" or "homogeneous", got {workload!r}')
+
+    # Extract chunksize (1 dispatches items one at a time, which suits heterogeneous workloads)
+    chunksize = kwargs.pop('chunksize', None)
+    target_batch_time = kwargs.pop('target_batch_time', 0.2)
+
+    if chunksize is not None and chunksize != 'auto' and not (isinstance(chunksize, int) and chunksize >= 1):
+        raise ValueError(f'chunksize must be a positive int or "auto", got {chunksize!r}')
+
+    # Extract max_prefetch (the number of items per worker submitted but not yet consumed, None for no limit)
+    max_prefetch = kwargs.pop('max_prefetch', 2)
+
+    if max_prefetch is not None and not (isinstance(max_prefetch, int) and max_prefetch >= 1):
+        raise ValueError(f'max_prefetch must be a positive int or None, got {max_prefetch!r}')
 
     # Determine length of tqdm (equal to length of shortest iterable or total kwarg), if possible
-    total = kwargs.pop('total', None)
-    lengths = [len(iterable) for iterable in iterables if isinstance(iterable, Sized)]
-    length = total or (min(lengths) if lengths else None)
+    length = _get_length(iterables, kwargs.pop('total', None))
 
-    # Create parallel generator
-    map_type = 'imap' if ordered else 'uimap'
-    assert mode and mode in ("parallel", "threading"), f"Internal error: recieved unknown mode {mode}"
-    pool = ProcessPool(num_cpus) if mode == "parallel" else ThreadPool(num_cpus)
-    map_func = getattr(pool, map_type)
+    # Homogeneous workloads are split into about 4 chunks per worker, like multiprocessing.Pool.map does
+    if chunksize is None:
+        if workload == "homogeneous" and length is not None:
+            chunksize = max(1, length // (num_cpus * 4))
+        else:
+            chunksize = 1
 
     # Choose tqdm variant
     tqdm_func = kwargs.pop('tqdm', tqdm)
+    _set_tqdm_defaults(kwargs, length)
+
+    iterators = tuple(iter(iterable) for iterable in iterables)
+    args = zip(*iterators)
+    first_results = []
+
+    # Choose between threads and processes based on how much of the first item's time was spent on the cpu
+    if mode == "auto":
+        try:
+            mode = _AUTO_MODES.get(function)
+        except TypeError:  # functions that can't be weakly referenced aren't cached
+            mode = None
+
+        if mode is None:
+            first_results, duration, cpu_duration = _probe(function, args)
+            # Functions that mostly wait (e.g. for I/O) run on threads, the rest on processes
+            mode = "threading" if cpu_duration < duration / 2 else "parallel"
+
+            try:
+                if first_results:
+                    _AUTO_MODES[function] = mode
+            except TypeError:
+                pass
+
+    # The default initializer only applies to processes
+    if mode == "threading" and initializer is _default_initializer:
+        initializer = None
+    if mode == "parallel" and backend == "loky" and get_reusable_executor is not None:
+        mode = "loky"
+    elif mode == "parallel" and start_method == "fork" and sys.platform != "win32":
+        mode = "fork"
+
+    # Decide whether the map is too small to be worth running in parallel
+    sequential = num_cpus == 1 and not force_parallel
+
+    if not sequential and not force_parallel and mode != "threading" and length is not None \
+            and _pool_key(mode, num_cpus, initializer, initargs) not in _POOL_CACHE:
+        # Only start the workers if the whole map would take longer than starting them, judging by how long
+        # the workers took per item in earlier maps of the function (which are never run here just to time them)
+        try:
+            item_duration = _ITEM_DURATIONS.get(function)
+        except TypeError:
+            item_duration = None
+        if item_duration is not None:
+            sequential = item_duration * length < _SPAWN_COSTS.get(mode, _SPAWN_OVERHEAD)
+
+    if sequential:
+        results = chain(first_results, starmap(function, args))
+        return _progress(tqdm_func, results, length, kwargs), lambda: None
+
+    # Time the items in the workers, keyed by the function itself rather than the wrappers below
+    record = partial(_record_duration, function)
+
+    shared = []
+    own_pool = None
+
+    try:
+        # Limit the number of tasks in flight (auto batching always needs a limit to adapt the batch size)
+        if max_prefetch is None and chunksize != 'auto':
+            num_tasks = None
+        else:
+            num_tasks = num_cpus * (2 if max_prefetch is None else max_prefetch)
+
+        # Create parallel generator (pools that can't be cached are closed once the map is done, except loky's own)
+        pool = _get_pool(mode, num_cpus, initializer, initargs)
+        if _pool_key(mode, num_cpus, initializer, initargs) is None and mode != "loky":
+            own_pool = pool
+        if mode in ("fork", "loky"):
+            submit = pool.submit
+        else:
+            submit = partial(_pool_submit, pool)
+
+        # Send the rest of large numpy arrays to worker processes through shared memory instead of pickling each element
+        # (once the workers have started, so that forked workers don't inherit this process's mapping of the memory)
+        if mode != "threading":
+            iterators = tuple(_share(iterable, iterator, len(first_results), shared)
+                              for iterable, iterator in zip(iterables, iterators))
+            if shared:
+                function = partial(_call_shared, function)
+                args = zip(*iterators)
+
+        # Ordered maps are run unordered with each item tagged by its index and put back in order as results arrive,
+        # so workers don't sit idle behind a slow item while the results after it wait to be consumed
+        # (but only until num_tasks chunks of results are held back, which bounds the memory they take)
+        held_back = []
+        if ordered:
+            start = len(first_results)
+            function = partial(_indexed, function)
+            args = enumerate(args, start)
+
+        if num_tasks is None and mode not in ("fork", "loky"):
+            results = pool.uimap(partial(_apply, function), args, chunksize=chunksize)
+        else:
+            results = _submit_uimap(submit, function, args, num_tasks, chunksize, target_batch_time,
+                                    held_back.__len__ if ordered else None, record)
+
+        if ordered:
+            results = _reorder(results, start, held_back)
+
+        results = chain(first_results, results)
+        iterator = _progress(tqdm_func, results, length, kwargs)
+    except BaseException:
+        _release(shared)
+        if own_pool is not None:
+            _close_pool(own_pool, graceful=False)
+        raise
+
+    _start_map()
+
+    return iterator, partial(_finish_map, shared, own_pool)
 
-    for item in tqdm_func(map_func(function, *iterables), total=length, **kwargs):
-        yield item
+def _parallel(ordered: bool, function: Callable, mode: str, *iterables: Iterable, **kwargs: Any) -> Generator:
+    """Returns a generator for a parallel map with a progress bar.
+
+    Arguments:
+        ordered(bool): True for an ordered map, false for an unordered map.
+        function(Callable): The function to apply to each element of the given Iterables.
+        mode(str): "threading", "parallel" or "auto"
+        iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
+
+    Returns:
+        A generator which will apply the function to each element of the given Iterables
+        in parallel in order with a progress bar.
+    """
+    iterator, cleanup = _build_iter(ordered, function, mode, *iterables, **kwargs)
 
-    pool.clear()
+    try:
+        for item in iterator:
+            yield item
+    finally:
+        cleanup()
 
 def p_imap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generator:
     """Returns a generator for a parallel ordered map with a progress bar.
@@ -66,12 +696,23 @@ def p_imap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generator
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
+        - mode(str): "parallel" to use processes (the default), "threading" to use threads, or "auto" to use threads for functions that spend most of their time waiting (e.g. for I/O) and processes otherwise, judging by the first item
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
+        - start_method(str): "fork" to use forked processes from the standard library instead of pathos (not on Windows). The function must then be picklable with pickle
+        - backend(str): "pathos" or "loky", the library providing the worker processes. "loky" falls back to pathos if loky isn't installed. Defaults to "pathos"
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = _parallel(True, function, "parallel", *iterables, **kwargs)
+    mode = kwargs.pop('mode', 'parallel')
+    generator = _parallel(True, function, mode, *iterables, **kwargs)
 
     return generator
 
@@ -83,13 +724,28 @@ def p_map(function: Callable, *iterables: Iterable, **kwargs: Any) -> List[Any]:
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
+        - mode(str): "parallel" to use processes (the default), "threading" to use threads, or "auto" to use threads for functions that spend most of their time waiting (e.g. for I/O) and processes otherwise, judging by the first item
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
+        - start_method(str): "fork" to use forked processes from the standard library instead of pathos (not on Windows). The function must then be picklable with pickle
+        - backend(str): "pathos" or "loky", the library providing the worker processes. "loky" falls back to pathos if loky isn't installed. Defaults to "pathos"
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = p_imap(function, *iterables, **kwargs)
-    result = list(generator)
+    mode = kwargs.pop('mode', 'parallel')
+    iterator, cleanup = _build_iter(True, function, mode, *iterables, **kwargs)
+
+    try:
+        result = list(iterator)
+    finally:
+        cleanup()
 
     return result
 
@@ -101,12 +757,23 @@ def p_uimap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generato
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
+        - mode(str): "parallel" to use processes (the default), "threading" to use threads, or "auto" to use threads for functions that spend most of their time waiting (e.g. for I/O) and processes otherwise, judging by the first item
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
+        - start_method(str): "fork" to use forked processes from the standard library instead of pathos (not on Windows). The function must then be picklable with pickle
+        - backend(str): "pathos" or "loky", the library providing the worker processes. "loky" falls back to pathos if loky isn't installed. Defaults to "pathos"
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = _parallel(False, function, "parallel", *iterables, **kwargs)
+    mode = kwargs.pop('mode', 'parallel')
+    generator = _parallel(False, function, mode, *iterables, **kwargs)
 
     return generator
 
@@ -119,13 +786,28 @@ def p_umap(function: Callable, *iterables: Iterable, **kwargs: Any) -> List[Any]
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
+        - mode(str): "parallel" to use processes (the default), "threading" to use threads, or "auto" to use threads for functions that spend most of their time waiting (e.g. for I/O) and processes otherwise, judging by the first item
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
+        - start_method(str): "fork" to use forked processes from the standard library instead of pathos (not on Windows). The function must then be picklable with pickle
+        - backend(str): "pathos" or "loky", the library providing the worker processes. "loky" falls back to pathos if loky isn't installed. Defaults to "pathos"
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = p_uimap(function, *iterables, **kwargs)
-    result = list(generator)
+    mode = kwargs.pop('mode', 'parallel')
+    iterator, cleanup = _build_iter(False, function, mode, *iterables, **kwargs)
+
+    try:
+        result = list(iterator)
+    finally:
+        cleanup()
 
     return result
 
@@ -142,11 +824,12 @@ def _sequential(function: Callable, *iterables: Iterable, **kwargs: Any) -> Gene
         sequentially in order with a progress bar.
     """
 
-    # Determine length of tqdm (equal to length of shortest iterable)
-    length = min(len(iterable) for iterable in iterables if isinstance(iterable, Sized))
+    # Determine length of tqdm (equal to length of shortest iterable or total kwarg), if possible
+    length = _get_length(iterables, kwargs.pop('total', None))
 
     # Create sequential generator
-    for item in tqdm(map(function, *iterables), total=length, **kwargs):
+    _set_tqdm_defaults(kwargs, length)
+    for item in _progress(tqdm, map(function, *iterables), length, kwargs):
         yield item
 
 def s_imap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generator:
@@ -157,7 +840,7 @@ def s_imap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generator
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
         - tqdm(tqdm object): the tqdm progress bar to use"""
 
@@ -188,8 +871,15 @@ def t_imap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generator
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
@@ -205,13 +895,24 @@ def t_map(function: Callable, *iterables: Iterable, **kwargs: Any) -> List[Any]:
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = p_imap(function, *iterables, **kwargs)
-    result = list(generator)
+    iterator, cleanup = _build_iter(True, function, "threading", *iterables, **kwargs)
+
+    try:
+        result = list(iterator)
+    finally:
+        cleanup()
 
     return result
 
@@ -223,8 +924,15 @@ def t_uimap(function: Callable, *iterables: Iterable, **kwargs: Any) -> Generato
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
@@ -241,12 +949,23 @@ def t_umap(function: Callable, *iterables: Iterable, **kwargs: Any) -> List[Any]
         - iterables(Tuple[Iterable]): One or more Iterables containing the data to be mapped.
     
     Keyword arguments:
-        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus
+        - num_cpus(int): Number of cpus to use. If unspecified, use all cpus available to the process
         - total(int): total elements in the iterator. If unspecified, this number will be automatically determined using the iterators
+        - chunksize(int or 'auto'): number of items sent to a worker at a time. Defaults to 1, or to about 4 chunks per worker for homogeneous workloads. 'auto' adapts the batch size while mapping
+        - workload(str): "heterogeneous" if items may take very different amounts of time, "homogeneous" if they all take about as long. Defaults to "heterogeneous"
+        - target_batch_time(float): with chunksize='auto', the number of seconds each batch should take. Defaults to 0.2
+        - force_parallel(bool): always use a pool, even for maps that look too small to benefit from one. Defaults to False
+        - max_prefetch(int): number of chunks per cpu that may be submitted before their results are consumed, which bounds memory use. Ordered maps also hold back at most this many chunks per cpu of results that finish before an earlier item. Defaults to 2; None removes both limits
+        - initializer(Callable): function called once in each worker when it starts. For processes, the default limits numpy and other numerical libraries to one thread per worker; pass None to disable
+        - initargs(Tuple): arguments for the initializer
         - tqdm(tqdm object): the tqdm progress bar to use
         - other kwargs already present in tqdm"""
 
-    generator = p_uimap(function, *iterables, **kwargs)
-    result = list(generator)
+    iterator, cleanup = _build_iter(False, function, "threading", *iterables, **kwargs)
+
+    try:
+        result = list(iterator)
+    finally:
+        cleanup()
 
     return result
\ No newline at end of file
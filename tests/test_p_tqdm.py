@@ -1,7 +1,27 @@
+import os
+import subprocess
+import sys
+import threading
+import time
 import unittest
 from functools import partial
+from io import StringIO
+from unittest import mock
 
-from p_tqdm import p_map, p_imap, p_umap, p_uimap, t_map, t_imap
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import loky
+except ImportError:
+    loky = None
+
+from p_tqdm import p_map, p_imap, p_umap, p_uimap, s_map, s_imap, t_map, t_imap, t_umap, t_uimap
+from p_tqdm import p_tqdm as p_tqdm_module
+from p_tqdm.p_tqdm import _ATTACHED, _POOL_CACHE
+from tqdm import tqdm
 
 
 def add_1(a):
@@ -16,6 +36,62 @@ def add_3(a, b, c=0):
     return a + 2 * b + 3 * c
 
 
+OFFSET = 0
+
+
+def set_offset(offset):
+    global OFFSET
+    OFFSET = offset
+
+
+def slow_set_offset(offset):
+    time.sleep(2)
+    set_offset(offset)
+
+
+def add_offset(a):
+    return a + OFFSET
+
+
+class counting_tqdm(tqdm):
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        counting_tqdm.instances += 1
+        super().__init__(*args, **kwargs)
+
+
+def slow_first(a):
+    if a == 0:
+        time.sleep(0.5)
+    return a
+
+
+def quick_pid(a):
+    return os.getpid()
+
+
+def slow_pid(a):
+    time.sleep(0.2)
+    return os.getpid()
+
+
+def attached_blocks(a):
+    return len(_ATTACHED)
+
+
+def sleep_pid(a):
+    time.sleep(0.05)
+    return os.getpid()
+
+
+def busy_pid(a):
+    start = time.process_time()
+    while time.process_time() - start < 0.05:
+        pass
+    return os.getpid()
+
+
 class Test_p_map(unittest.TestCase):
     def __init__(self, *args, **kwargs):
         super(Test_p_map, self).__init__(*args, **kwargs)
@@ -90,6 +166,19 @@ class Test_p_map(unittest.TestCase):
         else:
             self.assertEqual(sorted(correct_array), sorted(result))
 
+    def test_only_generators(self):
+        generator_1 = (i for i in range(3))
+        generator_2 = (i for i in range(10, 13))
+        result = self.func(add_2, generator_1, generator_2)
+        if self.generator:
+            result = list(result)
+
+        correct_array = [10, 12, 14]
+        if self.ordered:
+            self.assertEqual(correct_array, result)
+        else:
+            self.assertEqual(sorted(correct_array), sorted(result))
+
     def test_list_and_generator_and_single_unequal_length(self):
         array = [1, 2, 3, 4, 5, 6]
         generator = range(3)
@@ -145,5 +234,352 @@ class Test_t_imap(Test_p_map):
         self.ordered = True
 
 
+class Test_t_umap(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = t_umap
+        self.generator = False
+        self.ordered = False
+
+
+class Test_t_uimap(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = t_uimap
+        self.generator = True
+        self.ordered = False
+
+
+class Test_threads(unittest.TestCase):
+    def test_t_map_uses_threads(self):
+        result = t_map(sleep_pid, range(4), num_cpus=2, force_parallel=True)
+        self.assertEqual([os.getpid()] * 4, result)
+
+    def test_t_umap_uses_threads(self):
+        result = t_umap(sleep_pid, range(4), num_cpus=2, force_parallel=True)
+        self.assertEqual([os.getpid()] * 4, result)
+
+
+class Test_s_map(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = s_map
+        self.generator = False
+        self.ordered = True
+
+
+class Test_s_imap(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = s_imap
+        self.generator = True
+        self.ordered = True
+
+
+class Test_p_map_force_parallel(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, num_cpus=2, force_parallel=True)
+        self.generator = False
+        self.ordered = True
+
+
+class Test_p_uimap_force_parallel(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_uimap, num_cpus=2, force_parallel=True)
+        self.generator = True
+        self.ordered = False
+
+
+@unittest.skipIf(sys.platform == 'win32', 'fork is not available on Windows')
+class Test_p_map_fork(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, num_cpus=2, force_parallel=True, start_method='fork')
+        self.generator = False
+        self.ordered = True
+
+
+@unittest.skipIf(sys.platform == 'win32', 'fork is not available on Windows')
+class Test_p_map_fork_unbounded(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, num_cpus=2, force_parallel=True, start_method='fork', max_prefetch=None)
+        self.generator = False
+        self.ordered = True
+
+
+@unittest.skipIf(sys.platform == 'win32', 'fork is not available on Windows')
+class Test_p_uimap_fork(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_uimap, num_cpus=2, force_parallel=True, start_method='fork')
+        self.generator = True
+        self.ordered = False
+
+
+@unittest.skipIf(loky is None, 'loky is not installed')
+class Test_p_map_loky(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, backend='loky', num_cpus=2, force_parallel=True)
+        self.generator = False
+        self.ordered = True
+
+
+@unittest.skipIf(loky is None, 'loky is not installed')
+class Test_p_map_loky_unbounded(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, backend='loky', num_cpus=2, force_parallel=True, max_prefetch=None)
+        self.generator = False
+        self.ordered = True
+
+
+@unittest.skipIf(loky is None, 'loky is not installed')
+class Test_p_uimap_loky(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_uimap, backend='loky', num_cpus=2, force_parallel=True)
+        self.generator = True
+        self.ordered = False
+
+
+class Test_p_map_auto_chunksize(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, chunksize='auto', force_parallel=True)
+        self.generator = False
+        self.ordered = True
+
+
+class Test_p_uimap_auto_chunksize(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_uimap, chunksize='auto', force_parallel=True)
+        self.generator = True
+        self.ordered = False
+
+
+class Test_p_map_homogeneous(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, workload='homogeneous', force_parallel=True)
+        self.generator = False
+        self.ordered = True
+
+
+class Test_workload(unittest.TestCase):
+    def test_homogeneous_large_map(self):
+        result = p_map(add_1, range(1000), num_cpus=2, workload='homogeneous', force_parallel=True)
+        self.assertEqual(list(range(1, 1001)), result)
+
+    def test_unknown_workload(self):
+        with self.assertRaises(ValueError):
+            p_map(add_1, [1, 2, 3], workload='uniform')
+
+
+class Test_p_map_auto_mode(Test_p_map):
+    def __init__(self, *args, **kwargs):
+        super(Test_p_map, self).__init__(*args, **kwargs)
+        self.func = partial(p_map, mode='auto')
+        self.generator = False
+        self.ordered = True
+
+
+class Test_auto_mode(unittest.TestCase):
+    def test_waiting_function_uses_threads(self):
+        result = p_map(sleep_pid, range(4), num_cpus=2, force_parallel=True, mode='auto')
+        self.assertEqual([os.getpid()] * 4, result)
+
+    def test_busy_function_uses_processes(self):
+        result = p_map(busy_pid, range(4), num_cpus=2, force_parallel=True, mode='auto')
+        self.assertNotEqual([os.getpid()] * 4, result)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            p_map(add_1, [1, 2, 3], mode='processes')
+
+    def test_invalid_chunksize(self):
+        for chunksize in (0, -1, 1.5, 'big'):
+            with self.assertRaises(ValueError):
+                p_map(add_1, [1, 2, 3], chunksize=chunksize, force_parallel=True)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            p_map(add_1, [1, 2, 3], backend='dask')
+
+
+class Test_max_prefetch(unittest.TestCase):
+    def test_bounded_inputs(self):
+        pulled = []
+
+        def generator():
+            for i in range(1000):
+                pulled.append(i)
+                yield i
+
+        result = p_uimap(add_1, generator(), num_cpus=2, force_parallel=True, max_prefetch=2)
+        self.assertIn(next(result), range(1, 6))
+        time.sleep(0.5)
+        result.close()
+
+        # 2 cpus * 2 items each, plus one more after the first result was consumed
+        self.assertLessEqual(len(pulled), 5)
+
+    def test_slow_first_item(self):
+        pulled = []
+
+        def generator():
+            for i in range(1000):
+                pulled.append(i)
+                yield i
+
+        result = p_imap(slow_first, generator(), num_cpus=2, force_parallel=True, max_prefetch=1)
+        self.assertEqual(0, next(result))
+        result.close()
+
+        # 2 cpus * 1 item each in flight, plus 2 results held back behind the first item
+        self.assertLessEqual(len(pulled), 5)
+
+    def test_unbounded(self):
+        result = p_map(add_1, [1, 2, 3], num_cpus=2, force_parallel=True, max_prefetch=None)
+        self.assertEqual([2, 3, 4], result)
+
+    def test_invalid_max_prefetch(self):
+        for max_prefetch in (0, -1, 1.5):
+            with self.assertRaises(ValueError):
+                p_map(add_1, [1, 2, 3], max_prefetch=max_prefetch, force_parallel=True)
+
+    def test_interleaved_maps(self):
+        for imap in (t_imap, partial(p_imap, force_parallel=True)):
+            result = list(zip(imap(add_1, range(200), num_cpus=2), imap(add_1, range(200), num_cpus=2)))
+            self.assertEqual([(i, i) for i in range(1, 201)], result)
+
+    def test_abandoned_map(self):
+        for imap, map_func in ((t_imap, t_map), (partial(p_imap, force_parallel=True), partial(p_map, force_parallel=True))):
+            abandoned = imap(add_1, range(200), num_cpus=2)
+            self.assertEqual(1, next(abandoned))
+            self.assertEqual(list(range(1, 201)), map_func(add_1, range(200), num_cpus=2))
+            abandoned.close()
+
+
+class Test_disable(unittest.TestCase):
+    def setUp(self):
+        counting_tqdm.instances = 0
+
+    def test_disabled_skips_progress_bar(self):
+        result = p_map(add_1, [1, 2, 3], tqdm=counting_tqdm, disable=True)
+        self.assertEqual([2, 3, 4], result)
+        self.assertEqual(0, counting_tqdm.instances)
+
+    def test_not_a_terminal_skips_progress_bar(self):
+        result = p_map(add_1, [1, 2, 3], tqdm=counting_tqdm, disable=None, file=StringIO())
+        self.assertEqual([2, 3, 4], result)
+        self.assertEqual(0, counting_tqdm.instances)
+
+    def test_enabled_uses_progress_bar(self):
+        result = p_map(add_1, [1, 2, 3], tqdm=counting_tqdm, file=StringIO())
+        self.assertEqual([2, 3, 4], result)
+        self.assertEqual(1, counting_tqdm.instances)
+
+
+class Test_small_maps(unittest.TestCase):
+    def test_first_map_runs_on_workers(self):
+        result = p_map(slow_pid, range(4), num_cpus=4)
+        self.assertNotIn(os.getpid(), result)
+
+    def test_quick_map_runs_sequentially(self):
+        p_map(quick_pid, range(4), num_cpus=2, force_parallel=True)
+        result = p_map(quick_pid, range(4), num_cpus=5)
+        self.assertEqual([os.getpid()] * 4, result)
+
+    def test_one_cpu_runs_sequentially(self):
+        result = p_map(slow_pid, range(2), num_cpus=1)
+        self.assertEqual([os.getpid()] * 2, result)
+
+
+class Test_initializer(unittest.TestCase):
+    def test_initializer(self):
+        result = p_map(add_offset, [1, 2, 3], num_cpus=2, initializer=set_offset, initargs=(10,))
+        self.assertEqual([11, 12, 13], result)
+
+    def test_slow_initializer_does_not_block_other_pools(self):
+        result = []
+        thread = threading.Thread(target=lambda: result.extend(
+            p_map(add_offset, [1, 2, 3], num_cpus=3, initializer=slow_set_offset, initargs=(20,))))
+        thread.start()
+        time.sleep(0.2)
+
+        start = time.perf_counter()
+        self.assertEqual([2, 3, 4], t_map(add_1, [1, 2, 3], num_cpus=2))
+        self.assertLess(time.perf_counter() - start, 1)
+
+        thread.join()
+        self.assertEqual([21, 22, 23], result)
+
+    def test_unhashable_initargs(self):
+        pools = len(_POOL_CACHE)
+        for offset in range(3):
+            result = p_map(add_offset, [1, 2, 3], num_cpus=2, initializer=set_offset, initargs=[offset])
+            self.assertEqual([1 + offset, 2 + offset, 3 + offset], result)
+
+        self.assertEqual(pools, len(_POOL_CACHE))
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class Test_shared_numpy(unittest.TestCase):
+    def test_large_array(self):
+        array = np.arange(400000, dtype=np.float64).reshape(1000, 400)
+        result = p_map(np.sum, array, num_cpus=2, force_parallel=True)
+
+        self.assertEqual([row.sum() for row in array], result)
+
+    def test_large_array_and_list(self):
+        array = np.arange(400000, dtype=np.float64)
+        result = p_umap(add_2, array, [1, 2, 3], num_cpus=2, force_parallel=True)
+
+        self.assertEqual([1.0, 3.0, 5.0], sorted(result))
+
+    def test_failed_share_releases_earlier_arrays(self):
+        SharedMemory = p_tqdm_module.SharedMemory
+        created = []
+
+        def shared_memory(*args, **kwargs):
+            if len(created) == 1:
+                raise OSError('no space left on device')
+            created.append(SharedMemory(*args, **kwargs))
+            return created[-1]
+
+        array = np.zeros(400000)
+        with mock.patch.object(p_tqdm_module, 'SharedMemory', side_effect=shared_memory):
+            with self.assertRaises(OSError):
+                p_map(add_2, array, array, num_cpus=2, force_parallel=True)
+
+        with self.assertRaises(FileNotFoundError):
+            SharedMemory(name=created[0].name)
+
+    @unittest.skipIf(sys.platform == 'win32', 'the resource tracker is only used on POSIX')
+    def test_numpy_imported_after_pool(self):
+        script = (
+            'from p_tqdm import p_map\n'
+            'p_map(abs, range(4), num_cpus=2, force_parallel=True, disable=True)\n'
+            'import numpy as np\n'
+            'p_map(np.sum, np.zeros((100, 25000)), num_cpus=2, force_parallel=True, disable=True)\n'
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True, timeout=60)
+
+        self.assertEqual(0, process.returncode, process.stderr)
+        self.assertNotIn('resource_tracker', process.stderr)
+
+    def test_earlier_maps_detached(self):
+        for _ in range(3):
+            array = np.zeros((1000, 400))
+            result = p_map(attached_blocks, array, num_cpus=2, force_parallel=True)
+            self.assertEqual({1}, set(result))
+
+
 if __name__ == '__main__':
     unittest.main()